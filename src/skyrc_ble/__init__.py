@@ -2,6 +2,7 @@ from __future__ import annotations
 
 __version__ = "2.1.0"
 
+from . import trace
 from .const import (
     MC3000_BLUETOOTH_NAMES,
     MC3000_CHANNEL_COUNT,
@@ -9,9 +10,23 @@ from .const import (
     MC3000_SERVICE_UUID,
 )
 from .device import SkyRcDevice
+from .estimator import ChannelEstimate, ChannelEstimator, Mc3000Estimator
 from .mc3000 import Mc3000, Mc3000BasicData, Mc3000ChannelData, Mc3000State
+from .models import Mc3000Snapshot
+from .poller import Poller
+from .scheduler import ChargeJob, ChargeScheduler, SchedulerStats, SlotAssignment
+from .threaded import Mc3000ThreadedClient
+from .watchdog import (
+    Mc3000Watchdog,
+    RateRule,
+    StatusRule,
+    ThresholdRule,
+    WatchdogAction,
+    WatchdogEvent,
+)
 
 __all__ = [
+    "trace",
     "SkyRcDevice",
     "MC3000_BLUETOOTH_NAMES",
     "MC3000_SERVICE_UUID",
@@ -21,4 +36,20 @@ __all__ = [
     "Mc3000BasicData",
     "Mc3000ChannelData",
     "Mc3000State",
+    "Mc3000Snapshot",
+    "Mc3000ThreadedClient",
+    "Poller",
+    "ChannelEstimate",
+    "ChannelEstimator",
+    "Mc3000Estimator",
+    "ChargeJob",
+    "ChargeScheduler",
+    "SchedulerStats",
+    "SlotAssignment",
+    "Mc3000Watchdog",
+    "RateRule",
+    "StatusRule",
+    "ThresholdRule",
+    "WatchdogAction",
+    "WatchdogEvent",
 ]
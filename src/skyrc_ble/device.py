@@ -2,20 +2,33 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Generic, TypeVar
+from typing import Any, Callable, Generic, Optional, Tuple, TypeVar
 
 from bleak import BleakClient
 from bleak.backends.device import BLEDevice
+from bleak.backends.service import BleakGATTCharacteristic
 from bleak.exc import BleakError
 from bleak_retry_connector import establish_connection
 
+from . import trace
+from .schema import PacketSchema
+
 _LOGGER = logging.getLogger(__name__)
 _T = TypeVar("_T")
 
+PACKET_MAGIC = 0x0F
+PACKET_LENGTH = 20
+
+PacketHandler = Callable[[dict[str, Any]], None]
+PacketDispatchEntry = Tuple[PacketSchema, Optional[str]]
+
 
 class SkyRcDevice(Generic[_T]):
     _manufacturer: str = "SkyRC"
     _model: str = "Unknown"
+    _characteristic_uuid: str = ""
+    _packet_schemas: tuple[PacketDispatchEntry, ...] = ()
+    """Schemas of all known packets and the names of the methods handling them."""
 
     def __init__(self, ble_device: BLEDevice) -> None:
         """Init the SkyRC device."""
@@ -26,6 +39,11 @@ class SkyRcDevice(Generic[_T]):
         self._state: _T
         self._hw_version: str = ""
         self._sw_version: str = ""
+        self._disconnect_listeners: list[Callable[[], None]] = []
+        self._dispatch: dict[int, tuple[PacketSchema, PacketHandler | None]] = {
+            schema.command: (schema, getattr(self, handler) if handler else None)
+            for schema, handler in self._packet_schemas
+        }
 
     def set_ble_device(self, ble_device: BLEDevice) -> None:
         """Update the BLE device."""
@@ -69,12 +87,30 @@ class SkyRcDevice(Generic[_T]):
         """Get the state of the device."""
         return self._state
 
+    def add_disconnect_listener(
+        self, listener: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Register a listener called when the connection was lost.
+
+        Returns a function that removes the listener again.
+        """
+        self._disconnect_listeners.append(listener)
+
+        def remove_listener() -> None:
+            self._disconnect_listeners.remove(listener)
+
+        return remove_listener
+
     async def connect(self) -> bool:
         """Connect to the device."""
 
         if self.is_connected or self._client_lock.locked():
             return False
 
+        with trace.span("connect", self.name):
+            return await self._connect()
+
+    async def _connect(self) -> bool:
         async with self._client_lock:
             try:
                 _LOGGER.debug(
@@ -90,13 +126,26 @@ class SkyRcDevice(Generic[_T]):
                         self._ble_device.address,
                     )
                     self._client = None
+                    for listener in list(self._disconnect_listeners):
+                        try:
+                            listener()
+                        except Exception:  # pylint: disable=broad-except
+                            _LOGGER.exception(
+                                "%s: Error in disconnect listener", self.name
+                            )
 
-                self._client = await establish_connection(
-                    client_class=BleakClient,
-                    device=self._ble_device,
-                    name=self.name,
-                    disconnected_callback=disconnected_callback,
-                )
+                with trace.span("establish_connection", self.name):
+                    self._client = await establish_connection(
+                        client_class=BleakClient,
+                        device=self._ble_device,
+                        name=self.name,
+                        disconnected_callback=disconnected_callback,
+                    )
+
+                with trace.span("start_notify", self.name):
+                    await self._client.start_notify(
+                        self._characteristic_uuid, self._notification_callback
+                    )
 
                 _LOGGER.debug(
                     "%s: Successfully connected to address %s",
@@ -131,3 +180,83 @@ class SkyRcDevice(Generic[_T]):
 
         if not self.is_connected:
             await self.connect()
+
+    async def _send_packet(
+        self, command: int, payload: bytes | list[int] = b""
+    ) -> None:
+        """Send a packet to the device."""
+
+        # Pad payload with zeros
+        payload = list(payload)
+        payload += [0] * (PACKET_LENGTH - 3 - len(payload))
+
+        # Format packet and calculate checksum
+        packet = [PACKET_MAGIC, command, *payload, 0]
+        packet[-1] = sum(packet) & 255
+        packet_bytes = bytes(packet)
+
+        # Send packet and wait for response
+        _LOGGER.debug("%s: Sending packet: %s", self.name, packet_bytes.hex())
+        with trace.span("send_packet", self.name, command=command):
+            with trace.span("lock_wait", self.name):
+                await self._client_lock.acquire()
+            try:
+                self._packet_received.clear()
+                with trace.span("write", self.name):
+                    await self._client.write_gatt_char(
+                        self._characteristic_uuid, packet_bytes
+                    )
+                with trace.span("reply_wait", self.name) as span:
+                    try:
+                        await asyncio.wait_for(self._packet_received.wait(), 2)
+                    except asyncio.TimeoutError:
+                        if span is not None:
+                            span.args["timeout"] = True
+                        _LOGGER.warning(
+                            "%s: Timeout waiting for response notification", self.name
+                        )
+            finally:
+                self._client_lock.release()
+
+    async def _notification_callback(
+        self, sender: BleakGATTCharacteristic, packet: bytearray
+    ) -> None:
+        """Handle a GATT notification."""
+        with trace.span("parse_packet", self.name):
+            await self._parse_packet(packet)
+        self._packet_received.set()
+
+    async def _parse_packet(self, packet: bytearray) -> None:
+        """Parse single-packet messages and dispatch them to their handlers.
+
+        Multi-packet messages like voltage-curves are currently not supported.
+        """
+
+        _LOGGER.debug("%s: Received packet: %s", self.name, packet.hex())
+
+        if len(packet) < 3:
+            _LOGGER.warning("%s: Packet is too short", self.name)
+            return
+        if packet[0] != PACKET_MAGIC:
+            _LOGGER.warning("%s: Packet does not start with magic number", self.name)
+            return
+
+        entry = self._dispatch.get(packet[1])
+
+        checksum = sum(packet[0:-1]) & 255
+        if packet[-1] != checksum and (entry is None or entry[0].verify_checksum):
+            _LOGGER.warning(
+                "%s: Packet checksum (%x) does not match expected checksum (%x)",
+                self.name,
+                packet[-1],
+                checksum,
+            )
+            return
+
+        if entry is None:
+            _LOGGER.info("%s: Unknown packet type %d", self.name, packet[1])
+            return
+
+        schema, handler = entry
+        if handler is not None:
+            handler(schema.decode(packet))
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from .const import MC3000_CHANNEL_COUNT
+from .mc3000 import Mc3000
+from .models import BatteryType, ChannelStatus, Mc3000ChannelData
+from .poller import Poller
+
+# Constant voltage phase voltages of chemistries charged with CC/CV
+CV_VOLTAGES = {
+    BatteryType.LIION: 4.2,
+    BatteryType.LIFE: 3.6,
+    BatteryType.LIION_4_35: 4.35,
+}
+
+CV_VOLTAGE_TOLERANCE = 0.02
+
+# mAh per ampere-second
+AS_TO_MAH = 1000 / 3600
+
+
+@dataclass(frozen=True)
+class ChannelEstimate:
+    remaining_time: float | None = None
+    """Seconds until the channel is expected to reach DONE."""
+    final_capacity: float | None = None
+    """Projected capacity in mAh when the channel reaches DONE."""
+    time_confidence: float = 0.0
+    capacity_confidence: float = 0.0
+    constant_voltage: bool = False
+
+
+class _Ewma:
+    """Exponentially weighted mean and variance."""
+
+    __slots__ = ("alpha", "mean", "variance", "count")
+
+    def __init__(self, alpha: float) -> None:
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self) -> None:
+        self.mean = 0.0
+        self.variance = 0.0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        if self.count == 0:
+            self.mean = value
+        else:
+            delta = value - self.mean
+            self.mean += self.alpha * delta
+            self.variance = (1 - self.alpha) * (
+                self.variance + self.alpha * delta * delta
+            )
+        self.count += 1
+
+    def confidence(self) -> float:
+        """Map sample count and relative spread to a value between 0 and 1."""
+        if self.count == 0 or self.mean == 0:
+            return 0.0
+        spread = math.sqrt(self.variance) / abs(self.mean)
+        return (1 - math.exp(-self.count / 10)) / (1 + spread)
+
+
+class _EwRegression:
+    """Exponentially weighted least squares fit of a line."""
+
+    __slots__ = ("alpha", "count", "_origin", "_w", "_x", "_y", "_xx", "_xy", "_yy")
+
+    def __init__(self, alpha: float) -> None:
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self._origin = 0.0
+        self._w = self._x = self._y = self._xx = self._xy = self._yy = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        if self.count == 0:
+            self._origin = x
+        # Keep the moments small to avoid cancellation
+        x -= self._origin
+        decay = 1 - self.alpha
+        self._w = decay * self._w + 1
+        self._x = decay * self._x + x
+        self._y = decay * self._y + y
+        self._xx = decay * self._xx + x * x
+        self._xy = decay * self._xy + x * y
+        self._yy = decay * self._yy + y * y
+        self.count += 1
+
+    def _moments(self) -> tuple[float, float, float]:
+        """Get the variance of x, the covariance and the variance of y."""
+        mean_x = self._x / self._w
+        mean_y = self._y / self._w
+        return (
+            self._xx / self._w - mean_x * mean_x,
+            self._xy / self._w - mean_x * mean_y,
+            self._yy / self._w - mean_y * mean_y,
+        )
+
+    @property
+    def slope(self) -> float | None:
+        """Get the slope of the fitted line, None until x has varied."""
+        if self.count < 2:
+            return None
+        variance_x, covariance, _ = self._moments()
+        return covariance / variance_x if variance_x > 0 else None
+
+    def confidence(self) -> float:
+        """Map sample count and the standard error of the slope to 0..1."""
+        slope = self.slope
+        if slope is None or slope == 0:
+            return 0.0
+        variance_x, covariance, variance_y = self._moments()
+        residual = max(variance_y - slope * covariance, 0.0)
+        error = math.sqrt(residual / (variance_x * self._w))
+        return (1 - math.exp(-self.count / 10)) / (1 + error / abs(slope))
+
+
+class ChannelEstimator:
+    """Online estimate of remaining time and final capacity of a single channel.
+
+    Every frame updates exponentially weighted estimates in O(1): the voltage slope
+    during the constant current phase and a fit of the logarithm of the current over
+    time, i.e. its exponential decay, during the constant voltage phase of Li
+    chemistries. Other chemistries and discharging are only estimated if the
+    `nominal_capacity` (mAh) of the cell is known.
+    """
+
+    def __init__(
+        self,
+        termination_current: float = 0.1,
+        nominal_capacity: float | None = None,
+        cv_time_constant: float = 1200.0,
+        smoothing: float = 0.2,
+    ) -> None:
+        """Init the estimator.
+
+        `cv_time_constant` (seconds) is the assumed current decay of the constant
+        voltage phase until it can be measured.
+        """
+        self.termination_current = termination_current
+        self.nominal_capacity = nominal_capacity
+        self.cv_time_constant = cv_time_constant
+        self._voltage_slope = _Ewma(smoothing)
+        self._log_current = _EwRegression(smoothing)
+        self._last: Mc3000ChannelData | None = None
+        self._estimate = ChannelEstimate()
+
+    @property
+    def estimate(self) -> ChannelEstimate:
+        """Get the estimate based on the last frame."""
+        return self._estimate
+
+    def reset(self) -> None:
+        """Forget all previous frames."""
+        self._voltage_slope.reset()
+        self._log_current.reset()
+        self._last = None
+        self._estimate = ChannelEstimate()
+
+    def update(self, data: Mc3000ChannelData) -> ChannelEstimate:
+        """Update the estimate with a new channel data frame."""
+        last = self._last
+        if last is not None and (
+            data.time < last.time or data.type != last.type or data.mode != last.mode
+        ):
+            # A new program was started on the channel
+            self.reset()
+            last = None
+        self._last = data
+
+        cv_voltage = CV_VOLTAGES.get(data.type)
+        constant_voltage = (
+            cv_voltage is not None and data.voltage >= cv_voltage - CV_VOLTAGE_TOLERANCE
+        )
+
+        if data.is_working() and (last is None or data.time > last.time):
+            if constant_voltage:
+                # Frames with an unchanged or rising current are fitted as well, the
+                # reported current is quantized
+                if data.current > 0:
+                    self._log_current.add(data.time, math.log(data.current))
+            elif last is not None:
+                elapsed = data.time - last.time
+                self._voltage_slope.add((data.voltage - last.voltage) / elapsed)
+
+        self._estimate = self._calculate(data, cv_voltage, constant_voltage)
+        return self._estimate
+
+    def _calculate(
+        self,
+        data: Mc3000ChannelData,
+        cv_voltage: float | None,
+        constant_voltage: bool,
+    ) -> ChannelEstimate:
+        if data.status == ChannelStatus.DONE:
+            return ChannelEstimate(0.0, data.capacity, 1.0, 1.0, constant_voltage)
+        if not data.is_working() or data.current <= 0:
+            return ChannelEstimate(constant_voltage=constant_voltage)
+
+        if (
+            cv_voltage is None
+            or data.status != ChannelStatus.CHARGE
+            or (
+                self.nominal_capacity is not None
+                and self._voltage_slope.count == 0
+                and self._log_current.count == 0
+            )
+        ):
+            return self._calculate_from_capacity(data, constant_voltage)
+
+        current = data.current
+        termination = min(self.termination_current, current)
+        slope = self._log_current.slope
+        time_constant = -1 / slope if slope and slope < 0 else self.cv_time_constant
+        cv_time = time_constant * math.log(current / termination)
+        cv_capacity = (current - termination) * time_constant * AS_TO_MAH
+
+        if constant_voltage:
+            confidence = self._log_current.confidence()
+            return ChannelEstimate(
+                cv_time,
+                data.capacity + cv_capacity,
+                confidence,
+                confidence,
+                True,
+            )
+
+        slope = self._voltage_slope.mean
+        if self._voltage_slope.count == 0 or slope <= 0:
+            return ChannelEstimate(constant_voltage=False)
+        cc_time = (cv_voltage - data.voltage) / slope
+        confidence = self._voltage_slope.confidence()
+        if self._log_current.slope is None:
+            # The constant voltage phase has only been guessed
+            confidence /= 2
+        return ChannelEstimate(
+            cc_time + cv_time,
+            data.capacity + current * cc_time * AS_TO_MAH + cv_capacity,
+            confidence,
+            confidence,
+            False,
+        )
+
+    def _calculate_from_capacity(
+        self, data: Mc3000ChannelData, constant_voltage: bool
+    ) -> ChannelEstimate:
+        if self.nominal_capacity is None:
+            return ChannelEstimate(constant_voltage=constant_voltage)
+        remaining = max(self.nominal_capacity - data.capacity, 0)
+        confidence = 0.5 if data.capacity > 0 else 0.25
+        return ChannelEstimate(
+            remaining / (data.current * AS_TO_MAH),
+            max(self.nominal_capacity, data.capacity),
+            confidence,
+            confidence,
+            constant_voltage,
+        )
+
+
+class Mc3000Estimator:
+    """Keep a `ChannelEstimator` for every channel of an MC3000 up to date."""
+
+    def __init__(
+        self,
+        device: Mc3000,
+        termination_current: float = 0.1,
+        nominal_capacity: float | None = None,
+    ) -> None:
+        """Init the estimator."""
+        self._device = device
+        self.channels = [
+            ChannelEstimator(termination_current, nominal_capacity)
+            for _ in range(MC3000_CHANNEL_COUNT)
+        ]
+        self._updated_at: list[float | None] = [None] * MC3000_CHANNEL_COUNT
+        self._remove_listener: Callable[[], None] | None = None
+        self._remove_wake_hint: Callable[[], None] | None = None
+
+    def start(self, poller: Poller | None = None, lead_time: float = 5.0) -> None:
+        """Start estimating from channel frames.
+
+        If a poller is given, it is woken up `lead_time` seconds before a channel
+        is expected to be done.
+        """
+        if self._remove_listener is None:
+            self._remove_listener = self._device.add_channel_listener(self._on_channel)
+        if poller is not None and self._remove_wake_hint is None:
+            self._remove_wake_hint = poller.add_wake_hint(
+                lambda: self.next_wakeup(lead_time)
+            )
+
+    def stop(self) -> None:
+        """Stop estimating."""
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
+        if self._remove_wake_hint is not None:
+            self._remove_wake_hint()
+            self._remove_wake_hint = None
+
+    def estimate(self, channel: int) -> ChannelEstimate:
+        """Get the estimate of a channel."""
+        return self.channels[channel].estimate
+
+    def next_wakeup(self, lead_time: float = 5.0) -> float | None:
+        """Get the seconds until the first channel is expected to be done."""
+        now = time.monotonic()
+        result = None
+        for estimator, updated_at in zip(self.channels, self._updated_at):
+            remaining = estimator.estimate.remaining_time
+            if not remaining or updated_at is None:
+                continue
+            delay = max(updated_at + remaining - lead_time - now, 0.0)
+            if result is None or delay < result:
+                result = delay
+        return result
+
+    def _on_channel(self, channel: int, data: Mc3000ChannelData) -> None:
+        self._updated_at[channel] = time.monotonic()
+        self.channels[channel].update(data)
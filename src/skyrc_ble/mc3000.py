@@ -1,13 +1,12 @@
 from __future__ import annotations
 
-import asyncio
 import logging
-from struct import Struct
+from typing import Any, Callable
 
 from bleak.backends.device import BLEDevice
-from bleak.backends.service import BleakGATTCharacteristic
 from bleak.exc import BleakError
 
+from . import trace
 from .const import MC3000_CHANNEL_COUNT, MC3000_CHARACTERISTIC_UUID
 from .device import SkyRcDevice
 from .models import (
@@ -22,11 +21,10 @@ from .models import (
     Mc3000State,
     TemperatureUnit,
 )
+from .schema import Field, PacketSchema, Skip
 
 _LOGGER = logging.getLogger(__name__)
 
-PACKET_MAGIC = 0x0F
-
 CMD_GET_CHANNEL_DATA = 0x55
 CMD_GET_VOLTAGE_CURVE = 0x56
 CMD_GET_VERSION_INFO = 0x57
@@ -34,38 +32,93 @@ CMD_GET_BASIC_DATA = 0x61
 CMD_START_CHARGE = 0x05
 CMD_STOP_CHARGE = 0xFE
 
-STRUCT_GET_CHANNEL_DATA = Struct(">BBBBBHHHHBHB")
-STRUCT_GET_VERSION_INFO = Struct(">xxxxxxxxxxxxBBB")
-STRUCT_GET_BASIC_DATA = Struct(">B?B?BH")
+SCHEMA_GET_CHANNEL_DATA = PacketSchema(
+    CMD_GET_CHANNEL_DATA,
+    [
+        Field("channel", "B"),
+        Field("type", "B", convert=BatteryType),
+        Field("mode", "B", convert=ChannelMode),
+        Field("count", "B"),
+        Field("status", "B", convert=ChannelStatus),
+        Field("time", "H"),
+        Field("voltage", "H", scale=1000),
+        Field("current", "H", scale=1000),
+        Field("capacity", "H"),
+        Field("temperature", "B"),
+        Field("resistance", "H"),
+        Field("leds", "B"),
+    ],
+)
+SCHEMA_GET_BASIC_DATA = PacketSchema(
+    CMD_GET_BASIC_DATA,
+    [
+        Field("temp_unit", "B", convert=TemperatureUnit),
+        Field("system_beep", "?"),
+        Field("display", "B", convert=DisplayMode),
+        Field("screensaver", "?"),
+        Field("cooling_fan", "B", convert=CoolingFanMode),
+        Field("input_voltage", "H", scale=1000),
+    ],
+)
+# Version info packets have invalid checksums, looks like a bug in the firmware
+SCHEMA_GET_VERSION_INFO = PacketSchema(
+    CMD_GET_VERSION_INFO,
+    [
+        Skip(12),
+        Field("fw_version_major", "B"),
+        Field("fw_version_minor", "B"),
+        Field("hw_version", "B"),
+    ],
+    verify_checksum=False,
+)
+SCHEMA_START_CHARGE = PacketSchema(CMD_START_CHARGE, [Field("channels", "B")])
+SCHEMA_STOP_CHARGE = PacketSchema(CMD_STOP_CHARGE, [Field("channels", "B")])
+
+REQUEST_GET_CHANNEL_DATA = PacketSchema(CMD_GET_CHANNEL_DATA, [Field("channel", "B")])
+
+ChannelListener = Callable[[int, Mc3000ChannelData], None]
 
 
 class Mc3000(SkyRcDevice[Mc3000State]):
     _model = "MC3000"
+    _characteristic_uuid = MC3000_CHARACTERISTIC_UUID
+    _packet_schemas = (
+        (SCHEMA_GET_CHANNEL_DATA, "_handle_channel_data"),
+        (SCHEMA_GET_BASIC_DATA, "_handle_basic_data"),
+        (SCHEMA_GET_VERSION_INFO, "_handle_version_info"),
+        (SCHEMA_START_CHARGE, None),
+        (SCHEMA_STOP_CHARGE, None),
+    )
 
     def __init__(self, ble_device: BLEDevice) -> None:
         super().__init__(ble_device)
 
         self._state = Mc3000State()
+        self._channel_listeners: list[ChannelListener] = []
 
     async def connect(self) -> bool:
         """Connect to the device."""
-        if result := await super().connect():
-            async with self._client_lock:
-                await self._client.start_notify(
-                    MC3000_CHARACTERISTIC_UUID, self._notification_callback
-                )
-            await self._send_packet(CMD_GET_VERSION_INFO)
+        with trace.span("mc3000.connect", self.name):
+            if result := await super().connect():
+                await self._send_packet(CMD_GET_VERSION_INFO)
 
-        return result
+            return result
 
     async def update(self) -> None:
         """Update the state of the device."""
+        with trace.span("update", self.name):
+            await self._update()
+
+    async def _update(self) -> None:
         await super().update()
 
         try:
             await self._send_packet(CMD_GET_BASIC_DATA)
             for channel in range(0, MC3000_CHANNEL_COUNT):
-                await self._send_packet(CMD_GET_CHANNEL_DATA, [channel])
+                await self._send_packet(
+                    CMD_GET_CHANNEL_DATA,
+                    REQUEST_GET_CHANNEL_DATA.encode(channel=channel),
+                )
 
         except BleakError as error:
             if self.is_connected:
@@ -75,7 +128,9 @@ class Mc3000(SkyRcDevice[Mc3000State]):
         """Start charging the battery in the specified channel."""
         if channel not in range(0, MC3000_CHANNEL_COUNT):
             raise ValueError("Invalid channel")
-        await self._send_packet(CMD_START_CHARGE, [1 << channel])
+        await self._send_packet(
+            CMD_START_CHARGE, SCHEMA_START_CHARGE.encode(channels=1 << channel)
+        )
 
     async def start_charge_multi(self, channels: int) -> None:
         """Start charging the batteries in the specified channels.
@@ -84,13 +139,17 @@ class Mc3000(SkyRcDevice[Mc3000State]):
         """
         if channels not in range(0, 1 << MC3000_CHANNEL_COUNT):
             raise ValueError("Invalid channels")
-        await self._send_packet(CMD_START_CHARGE, [channels])
+        await self._send_packet(
+            CMD_START_CHARGE, SCHEMA_START_CHARGE.encode(channels=channels)
+        )
 
     async def stop_charge(self, channel: int) -> None:
         """Stop charging the battery in the specified channel."""
         if channel not in range(0, MC3000_CHANNEL_COUNT):
             raise ValueError("Invalid channel")
-        await self._send_packet(CMD_STOP_CHARGE, [1 << channel])
+        await self._send_packet(
+            CMD_STOP_CHARGE, SCHEMA_STOP_CHARGE.encode(channels=1 << channel)
+        )
 
     async def stop_charge_multi(self, channels: int) -> None:
         """Stop charging the batteries in the specified channels.
@@ -99,130 +158,50 @@ class Mc3000(SkyRcDevice[Mc3000State]):
         """
         if channels not in range(0, 1 << MC3000_CHANNEL_COUNT):
             raise ValueError("Invalid channels")
-        await self._send_packet(CMD_STOP_CHARGE, [channels])
-
-    async def _send_packet(self, command: int, payload: list[int] = []) -> None:
-        """Send a packet to the device."""
-
-        # Pad payload with zeros
-        payload = payload + [0] * (17 - len(payload))
+        await self._send_packet(
+            CMD_STOP_CHARGE, SCHEMA_STOP_CHARGE.encode(channels=channels)
+        )
 
-        # Format packet and calculate checksum
-        packet = [PACKET_MAGIC, command, *payload, 0]
-        packet[-1] = sum(packet) & 255
-        packet_bytes = bytes(packet)
+    def add_channel_listener(self, listener: ChannelListener) -> Callable[[], None]:
+        """Register a listener called with every decoded channel data frame.
 
-        # Send packet and wait for response
-        _LOGGER.debug("%s: Sending packet: %s", self.name, packet_bytes.hex())
-        async with self._client_lock:
-            self._packet_received.clear()
-            await self._client.write_gatt_char(MC3000_CHARACTERISTIC_UUID, packet_bytes)
-            try:
-                await asyncio.wait_for(self._packet_received.wait(), 2)
-            except TimeoutError:
-                _LOGGER.warn("%s: Timeout waiting for response notification")
-
-    async def _notification_callback(
-        self, sender: BleakGATTCharacteristic, packet: bytearray
-    ) -> None:
-        """Handle a GATT notification."""
-        await self._parse_packet(packet)
-        self._packet_received.set()
-
-    async def _parse_packet(self, packet: bytearray) -> None:
-        """Parse single-packet messages and update the data model.
-
-        Multi-packet messages like voltage-curves are currently not supported.
+        Listeners are called synchronously from the notification handler and must not
+        block. Commands have to be scheduled as separate tasks, as the client lock is
+        still held while the listener runs.
+        Returns a function that removes the listener again.
         """
+        self._channel_listeners.append(listener)
 
-        _LOGGER.debug("%s: Received packet: %s", self.name, packet.hex())
+        def remove_listener() -> None:
+            self._channel_listeners.remove(listener)
 
-        if len(packet) < 3:
-            _LOGGER.warn("%s: Packet is too short", self.name)
-            return
-        if packet[0] != PACKET_MAGIC:
-            _LOGGER.warn("%s: Packet does not start with magic number", self.name)
-            return
+        return remove_listener
 
-        checksum = sum(packet[0:-1]) & 255
-        if packet[-1] != checksum:
-            if (
-                packet[1] != CMD_GET_VERSION_INFO
-            ):  # Version info packets have invalid checksums, looks like a bug in the firmware
-                _LOGGER.warn(
-                    "%s: Packet checksum (%x) does not match expected checksum (%x)",
-                    self.name,
-                    packet[-1],
-                    checksum,
-                )
-                return
-
-        if packet[1] == CMD_GET_CHANNEL_DATA:
-            (
+    def _handle_channel_data(self, values: dict[str, Any]) -> None:
+        channel = values.pop("channel")
+        if channel >= MC3000_CHANNEL_COUNT:
+            _LOGGER.warning(
+                "%s: Received channel data for invalid channel %d",
+                self.name,
                 channel,
-                type,
-                mode,
-                count,
-                status,
-                time,
-                voltage,
-                current,
-                capacity,
-                temperature,
-                resistance,
-                leds,
-            ) = STRUCT_GET_CHANNEL_DATA.unpack_from(packet, 2)
-            if channel >= MC3000_CHANNEL_COUNT:
-                _LOGGER.warn(
-                    "%s: Received channel data for invalid channel %d",
-                    self.name,
-                    channel,
-                )
-                return
-            self._state.channels[channel] = Mc3000ChannelData(
-                BatteryType(type),
-                ChannelMode(mode),
-                count,
-                ChannelStatus(status),
-                time,
-                voltage / 1000.0,
-                current / 1000.0,
-                capacity,
-                temperature,
-                resistance,
-                self._resolve_channel_led(leds, channel),
             )
             return
+        values["led"] = self._resolve_channel_led(values.pop("leds"), channel)
+        data = Mc3000ChannelData(**values)
+        self._state.channels[channel] = data
+        for listener in list(self._channel_listeners):
+            try:
+                listener(channel, data)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("%s: Error in channel listener", self.name)
 
-        elif packet[1] == CMD_GET_BASIC_DATA:
-            (
-                temp_unit,
-                system_beep,
-                display,
-                screensaver,
-                cooling_fan,
-                input_voltage,
-            ) = STRUCT_GET_BASIC_DATA.unpack_from(packet, 2)
-            self._state.basic_data = Mc3000BasicData(
-                TemperatureUnit(temp_unit),
-                system_beep,
-                DisplayMode(display),
-                screensaver,
-                CoolingFanMode(cooling_fan),
-                input_voltage / 1000.0,
-            )
+    def _handle_basic_data(self, values: dict[str, Any]) -> None:
+        self._state.basic_data = Mc3000BasicData(**values)
 
-        elif packet[1] == CMD_GET_VERSION_INFO:
-            (
-                fw_version_major,
-                fw_version_minor,
-                hw_version,
-            ) = STRUCT_GET_VERSION_INFO.unpack_from(packet, 2)
-            self._sw_version = f"{fw_version_major}.{fw_version_minor}"
-            self._hw_version = f"{hw_version // 10}.{hw_version % 10}"
-
-        elif packet[1] not in [CMD_START_CHARGE, CMD_STOP_CHARGE]:
-            _LOGGER.info("%s: Unknown packet type %d", self.name, packet[1])
+    def _handle_version_info(self, values: dict[str, Any]) -> None:
+        hw_version = values["hw_version"]
+        self._sw_version = f"{values['fw_version_major']}.{values['fw_version_minor']}"
+        self._hw_version = f"{hw_version // 10}.{hw_version % 10}"
 
     def _resolve_channel_led(self, value: int, channel: int) -> LedColor:
         if (value >> channel) & 1:
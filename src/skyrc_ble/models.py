@@ -118,3 +118,15 @@ class Mc3000State:
     channels: list[Mc3000ChannelData | None] = field(
         default_factory=lambda: [None for _ in range(MC3000_CHANNEL_COUNT)]
     )
+
+
+@dataclass(frozen=True)
+class Mc3000Snapshot:
+    """Immutable copy of the state of an MC3000 at a point in time."""
+
+    basic_data: Mc3000BasicData | None = None
+    channels: tuple[Mc3000ChannelData | None, ...] = (None,) * MC3000_CHANNEL_COUNT
+    hw_version: str = ""
+    sw_version: str = ""
+    is_connected: bool = False
+    timestamp: float = 0.0
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from bleak.exc import BleakError
+
+from .device import SkyRcDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+WakeHint = Callable[[], Optional[float]]
+
+
+class Poller:
+    """Periodically call `update()` on a SkyRC device.
+
+    The interval can be changed at any time, e.g. by a watchdog that wants faster
+    updates, and takes effect immediately instead of after the current sleep.
+    Wake hints can request an earlier update, but never more often than
+    `min_interval`.
+    """
+
+    def __init__(
+        self,
+        device: SkyRcDevice[Any],
+        interval: float = 10.0,
+        min_interval: float = 1.0,
+    ) -> None:
+        """Init the poller."""
+        if interval <= 0:
+            raise ValueError("Invalid interval")
+        self._device = device
+        self._interval = interval
+        self._min_interval = min_interval
+        self._wake_hints: list[WakeHint] = []
+        self._update_listeners: list[Callable[[], None]] = []
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._poll_requested: bool = False
+        self._stopping: bool = False
+
+    @property
+    def device(self) -> SkyRcDevice[Any]:
+        """Get the polled device."""
+        return self._device
+
+    @property
+    def interval(self) -> float:
+        """Get the poll interval in seconds."""
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: float) -> None:
+        """Set the poll interval in seconds."""
+        if value <= 0:
+            raise ValueError("Invalid interval")
+        self._interval = value
+        self._wakeup.set()
+
+    @property
+    def is_running(self) -> bool:
+        """Get the running state."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling in a background task."""
+        if not self.is_running:
+            self._stopping = False
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and wait for the background task to finish."""
+        if self._task is None:
+            return
+        # asyncio.wait_for() may swallow the cancellation on older Python versions,
+        # so the loop also checks this flag before every update.
+        self._stopping = True
+        self._wakeup.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def poll_now(self) -> None:
+        """Trigger an update without waiting for the interval to elapse."""
+        self._poll_requested = True
+        self._wakeup.set()
+
+    def add_wake_hint(self, hint: WakeHint) -> Callable[[], None]:
+        """Register a function returning the seconds until an update is wanted.
+
+        The hint is evaluated after every update and may return None if it has no
+        preference.
+        Returns a function that removes the hint again.
+        """
+        self._wake_hints.append(hint)
+        self._wakeup.set()
+
+        def remove_hint() -> None:
+            self._wake_hints.remove(hint)
+
+        return remove_hint
+
+    def add_update_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Register a listener called after every update, even a failed one.
+
+        Returns a function that removes the listener again.
+        """
+        self._update_listeners.append(listener)
+
+        def remove_listener() -> None:
+            self._update_listeners.remove(listener)
+
+        return remove_listener
+
+    def _next_deadline(self, started: float, now: float) -> float:
+        """Get the loop time of the next update."""
+        deadline = started + self._interval
+        for hint in self._wake_hints:
+            delay = hint()
+            if delay is not None:
+                deadline = min(deadline, max(now + delay, started + self._min_interval))
+        return deadline
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            started = loop.time()
+            try:
+                await self._device.update()
+            except BleakError as error:
+                _LOGGER.warning("%s: Update failed: %s", self._device.name, error)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception(
+                    "%s: Unexpected error during update", self._device.name
+                )
+            for listener in list(self._update_listeners):
+                try:
+                    listener()
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("%s: Error in update listener", self._device.name)
+
+            # Sleep until the deadline, re-evaluating it whenever the interval changes
+            self._poll_requested = False
+            while not self._poll_requested and not self._stopping:
+                self._wakeup.clear()
+                now = loop.time()
+                remaining = self._next_deadline(started, now) - now
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
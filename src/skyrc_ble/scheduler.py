@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Sequence
+
+from bleak.exc import BleakError
+
+from .const import MC3000_CHANNEL_COUNT
+from .mc3000 import Mc3000
+from .models import BatteryType, ChannelMode, ChannelStatus, Mc3000ChannelData
+
+_LOGGER = logging.getLogger(__name__)
+
+IDLE_STATUSES = (ChannelStatus.STANDBY, ChannelStatus.DONE)
+
+
+@dataclass(frozen=True)
+class ChargeJob:
+    """A cell waiting to be processed by a charger slot.
+
+    The protocol cannot program a channel, so `battery_type` and `mode` only
+    restrict the job to slots already configured that way. `charge_current` and
+    `charge_voltage` are used to estimate the power drawn by the job,
+    `expected_duration` (seconds) to prefer short jobs.
+    """
+
+    cell_id: str
+    priority: int = 0
+    battery_type: BatteryType | None = None
+    mode: ChannelMode | None = None
+    charge_current: float = 1.0
+    charge_voltage: float = 4.2
+    expected_duration: float | None = None
+
+    @property
+    def power(self) -> float:
+        """Get the estimated power drawn by the job in watts."""
+        return self.charge_current * self.charge_voltage
+
+    def matches(self, data: Mc3000ChannelData) -> bool:
+        """Check whether the program configured on a channel fits this job."""
+        return (self.battery_type is None or self.battery_type == data.type) and (
+            self.mode is None or self.mode == data.mode
+        )
+
+
+@dataclass
+class SlotAssignment:
+    job: ChargeJob
+    device: Mc3000
+    channel: int
+    started_at: float
+    finished_at: float | None = None
+    status: ChannelStatus | None = None
+    """Final channel status, DONE for successfully finished jobs."""
+    has_worked: bool = False
+    _start_time: int = field(default=0, repr=False)
+    _last_frame: Mc3000ChannelData | None = field(default=None, repr=False)
+    _idle_frames: int = field(default=0, repr=False)
+
+
+@dataclass(frozen=True)
+class SchedulerStats:
+    slots: int
+    running: int
+    pending: int
+    finished: int
+    failed: int
+    utilization: float
+    """Fraction of slot time spent on jobs since the scheduler was created."""
+    cells_per_hour: float
+
+
+LoadCallback = Callable[[ChargeJob, Mc3000, int], Awaitable[bool]]
+
+
+class ChargeScheduler:
+    """Place queued charge jobs on free channels across several MC3000 chargers.
+
+    Call `schedule()` after every `update()` of the devices. Jobs are taken by
+    priority, then shortest expected duration first, which maximizes the number of
+    cells finished per hour. A job only starts if its estimated power still fits
+    into the power budget of the charger, derived from the input voltage and
+    `input_current_limit` unless set explicitly via `power_limits`.
+
+    Without a `load_callback`, jobs are only placed on STANDBY channels that already
+    hold a cell. A slot is not reused after a job finished on it until the cell was
+    swapped, i.e. the channel read 0 V and then a voltage again. A job that does not
+    start within `start_timeout` channel frames, or stops before reaching DONE, is
+    finished as failed.
+    """
+
+    def __init__(
+        self,
+        devices: Sequence[Mc3000],
+        input_current_limit: float = 5.0,
+        power_limits: dict[str, float] | None = None,
+        load_callback: LoadCallback | None = None,
+        start_timeout: int = 3,
+    ) -> None:
+        """Init the scheduler.
+
+        `load_callback` is awaited before a job is started on a STANDBY or DONE slot,
+        e.g. to let an operator or robot swap the cell. Returning False skips the slot.
+        """
+        self._devices = list(devices)
+        self._input_current_limit = input_current_limit
+        self._power_limits = dict(power_limits or {})
+        self._load_callback = load_callback
+        self._start_timeout = start_timeout
+        self._queue: list[tuple[int, float, int, ChargeJob]] = []
+        self._counter = itertools.count()
+        self._running: dict[tuple[str, int], SlotAssignment] = {}
+        self._finished: list[SlotAssignment] = []
+        # Slots holding the cell of a finished job, True once they were seen empty
+        self._swap_pending: dict[tuple[str, int], bool] = {}
+        self._created_at = time.monotonic()
+        self._accounted_at = self._created_at
+        self._busy_time = 0.0
+
+    @property
+    def pending(self) -> list[ChargeJob]:
+        """Get the queued jobs in scheduling order."""
+        return [entry[-1] for entry in sorted(self._queue)]
+
+    @property
+    def running(self) -> list[SlotAssignment]:
+        """Get the jobs currently placed on a slot."""
+        return list(self._running.values())
+
+    @property
+    def finished(self) -> list[SlotAssignment]:
+        """Get the completed jobs, including failed ones."""
+        return list(self._finished)
+
+    def submit(self, job: ChargeJob) -> None:
+        """Add a job to the queue."""
+        duration = job.expected_duration
+        heapq.heappush(
+            self._queue,
+            (
+                -job.priority,
+                duration if duration is not None else float("inf"),
+                next(self._counter),
+                job,
+            ),
+        )
+
+    def power_limit(self, device: Mc3000) -> float:
+        """Get the power budget of a charger in watts."""
+        if device.address in self._power_limits:
+            return self._power_limits[device.address]
+        basic_data = device.state.basic_data
+        if basic_data is None:
+            return 0.0
+        return basic_data.input_voltage * self._input_current_limit
+
+    def stats(self) -> SchedulerStats:
+        """Get throughput and slot utilization figures."""
+        now = time.monotonic()
+        self._account(now)
+        slots = len(self._devices) * MC3000_CHANNEL_COUNT
+        elapsed = now - self._created_at
+        done = [a for a in self._finished if a.status == ChannelStatus.DONE]
+        return SchedulerStats(
+            slots=slots,
+            running=len(self._running),
+            pending=len(self._queue),
+            finished=len(done),
+            failed=len(self._finished) - len(done),
+            utilization=(
+                self._busy_time / (elapsed * slots) if elapsed and slots else 0.0
+            ),
+            cells_per_hour=len(done) * 3600 / elapsed if elapsed else 0.0,
+        )
+
+    async def schedule(self) -> list[SlotAssignment]:
+        """Collect finished jobs and start pending ones on free channels.
+
+        Returns the newly started assignments.
+        """
+        self._account(time.monotonic())
+        started: list[SlotAssignment] = []
+        for device in self._devices:
+            self._collect_finished(device)
+            if self._queue:
+                started += await self._fill_device(device)
+        return started
+
+    def _account(self, now: float) -> None:
+        self._busy_time += (now - self._accounted_at) * len(self._running)
+        self._accounted_at = now
+
+    def _collect_finished(self, device: Mc3000) -> None:
+        for channel, data in enumerate(device.state.channels):
+            if data is None:
+                continue
+            key = (device.address, channel)
+            if key in self._swap_pending:
+                if data.voltage <= 0:
+                    self._swap_pending[key] = True
+                elif self._swap_pending[key]:
+                    del self._swap_pending[key]
+            assignment = self._running.get(key)
+            if assignment is None or data is assignment._last_frame:
+                continue
+            assignment._last_frame = data
+            if data.is_working():
+                assignment.has_worked = True
+                continue
+            if not (
+                assignment.has_worked
+                or data.status not in IDLE_STATUSES
+                # Finished before a working frame was seen, the timer was restarted
+                or (
+                    data.status == ChannelStatus.DONE
+                    and data.time != assignment._start_time
+                )
+            ):
+                # Frames from before the start command took effect
+                assignment._idle_frames += 1
+                if assignment._idle_frames <= self._start_timeout:
+                    continue
+                _LOGGER.warning(
+                    "%s: Job %s on channel %d did not start",
+                    device.name,
+                    assignment.job.cell_id,
+                    channel,
+                )
+            self._finish(assignment, data.status)
+
+    def _finish(self, assignment: SlotAssignment, status: ChannelStatus) -> None:
+        assignment.finished_at = time.monotonic()
+        assignment.status = status
+        key = (assignment.device.address, assignment.channel)
+        del self._running[key]
+        self._swap_pending[key] = False
+        self._finished.append(assignment)
+        _LOGGER.debug(
+            "%s: Job %s on channel %d finished with status %s",
+            assignment.device.name,
+            assignment.job.cell_id,
+            assignment.channel,
+            status.name,
+        )
+
+    async def _fill_device(self, device: Mc3000) -> list[SlotAssignment]:
+        budget = self.power_limit(device) - sum(
+            data.voltage * data.current
+            for data in device.state.channels
+            if data is not None and data.is_working()
+        )
+        # Jobs that were started but did not draw current yet are not reported
+        budget -= sum(
+            assignment.job.power
+            for (address, channel), assignment in self._running.items()
+            if address == device.address
+            and not _is_working(device.state.channels[channel])
+        )
+
+        started: list[SlotAssignment] = []
+        entries: list[tuple[int, float, int, ChargeJob]] = []
+        channels = 0
+        for channel, data in enumerate(device.state.channels):
+            if data is None or not self._is_free(device, channel, data):
+                continue
+            entry = self._take_job(data, budget)
+            if entry is None:
+                continue
+            job = entry[-1]
+            if self._load_callback is not None and not await self._load_callback(
+                job, device, channel
+            ):
+                # Keep the position in the queue
+                heapq.heappush(self._queue, entry)
+                continue
+            budget -= job.power
+            channels |= 1 << channel
+            assignment = SlotAssignment(
+                job,
+                device,
+                channel,
+                time.monotonic(),
+                _start_time=data.time,
+                _last_frame=data,
+            )
+            self._running[(device.address, channel)] = assignment
+            self._swap_pending.pop((device.address, channel), None)
+            started.append(assignment)
+            entries.append(entry)
+
+        if channels:
+            _LOGGER.debug(
+                "%s: Starting jobs %s",
+                device.name,
+                ", ".join(a.job.cell_id for a in started),
+            )
+            try:
+                await device.start_charge_multi(channels)
+            except BleakError as error:
+                _LOGGER.warning("%s: Failed to start jobs: %s", device.name, error)
+                for assignment, entry in zip(started, entries):
+                    del self._running[(device.address, assignment.channel)]
+                    heapq.heappush(self._queue, entry)
+                return []
+        return started
+
+    def _is_free(self, device: Mc3000, channel: int, data: Mc3000ChannelData) -> bool:
+        if (device.address, channel) in self._running:
+            return False
+        if self._load_callback is not None:
+            # The callback confirms that a fresh cell was loaded
+            return data.status in IDLE_STATUSES
+        # DONE slots still hold the finished cell, empty slots read 0 V
+        return (
+            data.status == ChannelStatus.STANDBY
+            and data.voltage > 0
+            and (device.address, channel) not in self._swap_pending
+        )
+
+    def _take_job(
+        self, data: Mc3000ChannelData, budget: float
+    ) -> tuple[int, float, int, ChargeJob] | None:
+        for entry in sorted(self._queue):
+            job = entry[-1]
+            if job.matches(data) and job.power <= budget:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return entry
+        return None
+
+
+def _is_working(data: Mc3000ChannelData | None) -> bool:
+    return data is not None and data.is_working()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import keyword
+from dataclasses import dataclass
+from struct import Struct
+from typing import Any, Callable, Sequence
+
+PAYLOAD_OFFSET = 2
+
+
+@dataclass(frozen=True)
+class Field:
+    """A single field of a packet payload.
+
+    `format` is a `struct` format character. Decoded values are divided by `scale`
+    and then passed to `convert` (usually an enum type), encoding applies the
+    inverse in reverse order.
+    """
+
+    name: str
+    format: str
+    scale: float | None = None
+    convert: Callable[[Any], Any] | None = None
+
+    def __post_init__(self) -> None:
+        # Names end up in generated source code, the empty name marks skipped bytes
+        if self.name and (not self.name.isidentifier() or keyword.iskeyword(self.name)):
+            raise ValueError(f"Invalid field name {self.name!r}")
+
+
+def Skip(count: int) -> Field:  # pylint: disable=invalid-name
+    """Describe `count` bytes of payload that are ignored."""
+    return Field("", f"{count}x")
+
+
+class PacketSchema:
+    """Declarative description of the payload of one command.
+
+    The field list is compiled into a `Struct` and a specialized decoder function,
+    so decoding a packet costs a single `unpack_from` plus the field conversions.
+    """
+
+    def __init__(
+        self,
+        command: int,
+        fields: Sequence[Field] = (),
+        verify_checksum: bool = True,
+    ) -> None:
+        """Init the packet schema."""
+        self.command = command
+        self.fields = tuple(fields)
+        self.verify_checksum = verify_checksum
+        self.struct = Struct(">" + "".join(field.format for field in self.fields))
+        self.decode: Callable[[bytes | bytearray], dict[str, Any]] = (
+            self._compile_decoder()
+        )
+        self.encode: Callable[..., bytes] = self._compile_encoder()
+
+    def __repr__(self) -> str:
+        return (
+            f"PacketSchema(command=0x{self.command:02x}, format={self.struct.format!r})"
+        )
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        """Get the names of all decoded fields in payload order."""
+        return tuple(field.name for field in self.fields if field.name)
+
+    def _compile_decoder(self) -> Callable[[bytes | bytearray], dict[str, Any]]:
+        namespace: dict[str, Any] = {"_unpack_from": self.struct.unpack_from}
+        variables = []
+        items = []
+        for index, field in enumerate(f for f in self.fields if f.name):
+            value = f"v{index}"
+            variables.append(value)
+            if field.scale is not None:
+                value = f"{value} / {float(field.scale)!r}"
+            if field.convert is not None:
+                namespace[f"_c{index}"] = field.convert
+                value = f"_c{index}({value})"
+            items.append(f"{field.name!r}: {value}")
+
+        if not variables:
+            return lambda packet: {}
+
+        source = (
+            "def decode(packet):\n"
+            f"    ({', '.join(variables)},) = _unpack_from(packet, {PAYLOAD_OFFSET})\n"
+            f"    return {{{', '.join(items)}}}\n"
+        )
+        exec(source, namespace)  # nosec
+        return namespace["decode"]
+
+    def _compile_encoder(self) -> Callable[..., bytes]:
+        namespace: dict[str, Any] = {"_pack": self.struct.pack}
+        arguments = []
+        values = []
+        for field in self.fields:
+            if not field.name:
+                continue
+            arguments.append(field.name)
+            value = field.name
+            if field.convert is not None:
+                value = f"int({value})"
+            if field.scale is not None:
+                value = f"round({value} * {float(field.scale)!r})"
+            values.append(value)
+
+        source = (
+            f"def encode({''.join(a + '=0, ' for a in arguments)}):\n"
+            f"    return _pack({', '.join(values)})\n"
+        )
+        exec(source, namespace)  # nosec
+        return namespace["encode"]
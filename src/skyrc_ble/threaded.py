@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional, Tuple, TypeVar
+
+from bleak.backends.device import BLEDevice
+
+from .mc3000 import Mc3000
+from .models import Mc3000ChannelData, Mc3000Snapshot
+from .poller import Poller
+
+_LOGGER = logging.getLogger(__name__)
+_R = TypeVar("_R")
+
+Command = Callable[[Mc3000], Awaitable[Any]]
+_QueueItem = Optional[Tuple[Command, "Future[Any]"]]
+
+
+class Mc3000ThreadedClient:
+    """Run an `Mc3000` on a background thread for non-asyncio applications.
+
+    The device, its poller and all BLE communication live on a private event loop.
+    After every channel frame, poll, command and disconnect an immutable
+    `Mc3000Snapshot` is published by replacing a single reference, so `snapshot` can be read from any thread
+    without blocking on BLE round trips. Commands are queued and executed in order;
+    each returns a `concurrent.futures.Future`.
+    """
+
+    def __init__(self, ble_device: BLEDevice, poll_interval: float = 10.0) -> None:
+        """Init the client."""
+        self._ble_device = ble_device
+        self._poll_interval = poll_interval
+        self._snapshot = Mc3000Snapshot()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_QueueItem] | None = None
+        self._ready = threading.Event()
+        self._device: Mc3000 | None = None
+        self._poller: Poller | None = None
+        self._startup_error: BaseException | None = None
+        # Guards stopping against concurrent submits and the outstanding futures
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._futures: set[Future[Any]] = set()
+
+    @property
+    def snapshot(self) -> Mc3000Snapshot:
+        """Get the latest published state."""
+        return self._snapshot
+
+    @property
+    def is_running(self) -> bool:
+        """Get the running state of the background thread."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background thread and begin polling the device."""
+        if self.is_running:
+            return
+        self._ready.clear()
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"skyrc_ble {self._ble_device.address}", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+        if (error := self._pop_startup_error()) is not None:
+            self._thread.join()
+            raise error
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Disconnect from the device and stop the background thread."""
+        with self._lock:
+            if not self.is_running:
+                return
+            if not self._stopping:
+                self._stopping = True
+                self._put(None)
+        self._thread.join(timeout)  # type: ignore[union-attr]
+
+    def submit(self, command: Callable[[Mc3000], Awaitable[_R]]) -> Future[_R]:
+        """Queue a coroutine function that is called with the device."""
+        future: Future[_R] = Future()
+        with self._lock:
+            if self._stopping or not self.is_running:
+                raise RuntimeError("Client is not running")
+            self._futures.add(future)
+            self._put((command, future))
+        future.add_done_callback(self._discard_future)
+        return future
+
+    def set_poll_interval(self, interval: float) -> None:
+        """Change the interval of the background updates."""
+        if interval <= 0:
+            raise ValueError("Invalid interval")
+        self._poll_interval = interval
+        if self._loop is not None and self._poller is not None:
+            poller = self._poller
+            self._loop.call_soon_threadsafe(setattr, poller, "interval", interval)
+
+    def update(self) -> Future[None]:
+        """Queue an update of the device state."""
+        return self.submit(lambda device: device.update())
+
+    def start_charge(self, channel: int) -> Future[None]:
+        """Queue starting to charge the battery in the specified channel."""
+        return self.submit(lambda device: device.start_charge(channel))
+
+    def start_charge_multi(self, channels: int) -> Future[None]:
+        """Queue starting to charge the batteries in the specified channels."""
+        return self.submit(lambda device: device.start_charge_multi(channels))
+
+    def stop_charge(self, channel: int) -> Future[None]:
+        """Queue stopping to charge the battery in the specified channel."""
+        return self.submit(lambda device: device.stop_charge(channel))
+
+    def stop_charge_multi(self, channels: int) -> Future[None]:
+        """Queue stopping to charge the batteries in the specified channels."""
+        return self.submit(lambda device: device.stop_charge_multi(channels))
+
+    def _pop_startup_error(self) -> BaseException | None:
+        error, self._startup_error = self._startup_error, None
+        return error
+
+    def _discard_future(self, future: Future[Any]) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _put(self, item: _QueueItem) -> None:
+        assert self._loop is not None and self._queue is not None
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._main(loop))
+        except Exception:  # pylint: disable=broad-except
+            # Startup errors are raised again by start() on the caller's thread
+            if self._startup_error is None:
+                _LOGGER.exception("Unexpected error in background thread")
+        finally:
+            with self._lock:
+                self._stopping = True
+            loop.close()
+            self._loop = None
+            # Fail commands that were queued after the command loop ended
+            with self._lock:
+                futures, self._futures = self._futures, set()
+            for future in futures:
+                if not future.done() and (
+                    future.running() or future.set_running_or_notify_cancel()
+                ):
+                    future.set_exception(RuntimeError("Client was stopped"))
+
+    async def _main(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Everything bound to the event loop has to be created on this thread
+        try:
+            self._queue = queue = asyncio.Queue[_QueueItem]()
+            self._device = device = Mc3000(self._ble_device)
+            self._poller = poller = Poller(device, self._poll_interval)
+            remove_listeners = (
+                device.add_channel_listener(self._on_channel),
+                device.add_disconnect_listener(self._publish),
+                poller.add_update_listener(self._publish),
+            )
+            self._loop = loop
+        except BaseException as error:
+            self._startup_error = error
+            raise
+        finally:
+            self._ready.set()
+
+        poller.start()
+        try:
+            while (item := await queue.get()) is not None:
+                command, future = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = await command(device)
+                except Exception as error:  # pylint: disable=broad-except
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+                self._publish()
+        finally:
+            for remove_listener in remove_listeners:
+                remove_listener()
+            await poller.stop()
+            await device.disconnect()
+            self._publish()
+
+    def _on_channel(self, channel: int, data: Mc3000ChannelData) -> None:
+        self._publish()
+
+    def _publish(self) -> None:
+        device = self._device
+        assert device is not None
+        state = device.state
+        self._snapshot = Mc3000Snapshot(
+            state.basic_data,
+            tuple(state.channels),
+            device.hw_version,
+            device.sw_version,
+            device.is_connected,
+            time.monotonic(),
+        )
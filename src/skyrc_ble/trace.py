@@ -0,0 +1,190 @@
+"""Lightweight tracing of the device communication.
+
+Tracing is disabled by default, in which case `span()` returns a shared no-op
+context manager. Enable it with `enable()` and write the collected spans in the
+Chrome trace event format, which can be opened in Perfetto or chrome://tracing.
+Every track (usually a device) becomes a process, and every asyncio task (or thread
+outside of a task) with open spans on it gets its own thread, so spans of concurrent
+tasks never overlap. A tracer may be shared by event loops on several threads:
+
+    tracer = trace.enable()
+    await mc3000.update()
+    tracer.export_chrome_trace("update.json")
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, ContextManager
+
+_NULL_SPAN: ContextManager[None] = nullcontext()
+
+_tracer: Tracer | None = None
+
+
+class Span:
+    """A timed section of a track, recorded as a complete trace event."""
+
+    __slots__ = ("_tracer", "name", "track", "args", "start", "tid", "_owner")
+
+    def __init__(
+        self, tracer: Tracer, name: str, track: str, args: dict[str, Any]
+    ) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.track = track
+        self.args = args
+        self.start = 0
+        self.tid = 0
+        self._owner: object = None
+
+    def __enter__(self) -> Span:
+        self._owner = _current_owner()
+        self.tid = self._tracer._acquire_tid(self.track, self._owner)
+        self.start = time.monotonic_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        end = time.monotonic_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self._tracer._record(self, end)
+        self._tracer._release_tid(self.track, self._owner)
+
+
+class Tracer:
+    """Collect spans in memory, keeping at most `max_events` of them."""
+
+    def __init__(self, max_events: int | None = 100000) -> None:
+        """Init the tracer."""
+        self._events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self._tracks: dict[str, int] = {}
+        self._threads: dict[str, int] = {}
+        self._free_tids: dict[str, list[int]] = {}
+        self._open: dict[tuple[str, object], list[int]] = {}
+        # Guards the track and thread allocation, spans may end on other threads
+        self._lock = threading.Lock()
+
+    @property
+    def events(self) -> list[dict[str, Any]]:
+        """Get the recorded trace events."""
+        return list(self._events)
+
+    def clear(self) -> None:
+        """Drop all recorded events."""
+        self._events.clear()
+
+    def span(self, name: str, track: str = "", **args: Any) -> Span:
+        """Create a span on the given track, usually the device name."""
+        return Span(self, name, track, args)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Get the recorded events in the Chrome trace event format."""
+        metadata: list[dict[str, Any]] = []
+        with self._lock:
+            tracks = list(self._tracks.items())
+            threads = dict(self._threads)
+        for track, pid in tracks:
+            name = track or "skyrc_ble"
+            metadata.append(
+                {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}}
+            )
+            metadata += [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": f"{name} #{tid}"},
+                }
+                for tid in range(1, threads[track] + 1)
+            ]
+        return {"traceEvents": metadata + list(self._events), "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str | os.PathLike[str]) -> None:
+        """Write the recorded events to a Chrome trace JSON file."""
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_chrome_trace(), file)
+
+    def _acquire_tid(self, track: str, owner: object) -> int:
+        """Get the thread of a task on a track, allocating a free one if needed."""
+        key = (track, owner)
+        with self._lock:
+            entry = self._open.get(key)
+            if entry is None:
+                self._tracks.setdefault(track, len(self._tracks) + 1)
+                free = self._free_tids.setdefault(track, [])
+                if free:
+                    tid = heapq.heappop(free)
+                else:
+                    tid = self._threads[track] = self._threads.get(track, 0) + 1
+                entry = self._open[key] = [tid, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_tid(self, track: str, owner: object) -> None:
+        """Return the thread of a task once its outermost span ended."""
+        key = (track, owner)
+        with self._lock:
+            entry = self._open[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._open[key]
+                heapq.heappush(self._free_tids[track], entry[0])
+
+    def _record(self, span: Span, end: int) -> None:
+        # The track was registered by _acquire_tid() and is never removed
+        self._events.append(
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start / 1000,
+                "dur": (end - span.start) / 1000,
+                "pid": self._tracks[span.track],
+                "tid": span.tid,
+                "args": span.args,
+            }
+        )
+
+
+def enable(max_events: int | None = 100000) -> Tracer:
+    """Start recording spans, returns the active tracer."""
+    global _tracer  # pylint: disable=global-statement
+    if _tracer is None:
+        _tracer = Tracer(max_events)
+    return _tracer
+
+
+def disable() -> Tracer | None:
+    """Stop recording spans, returns the previously active tracer."""
+    global _tracer  # pylint: disable=global-statement
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Tracer | None:
+    """Get the active tracer, if tracing is enabled."""
+    return _tracer
+
+
+def span(name: str, track: str = "", **args: Any) -> ContextManager[Any]:
+    """Create a span on the active tracer, or a no-op if tracing is disabled."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, track, args)
+
+
+def _current_owner() -> object:
+    """Get the current asyncio task, or the current thread outside of a task."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from enum import IntFlag
+from typing import Callable, Sequence, Union
+
+from .const import MC3000_CHANNEL_COUNT
+from .mc3000 import Mc3000
+from .models import ChannelStatus, Mc3000ChannelData
+from .poller import Poller
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class WatchdogAction(IntFlag):
+    NONE = 0
+    STOP_CHARGE = 1
+    ALERT = 2
+    FAST_POLL = 4
+
+
+@dataclass(frozen=True)
+class StatusRule:
+    """Trigger when the channel reports one of the given status codes."""
+
+    statuses: frozenset[ChannelStatus]
+    action: WatchdogAction = WatchdogAction.STOP_CHARGE | WatchdogAction.ALERT
+
+    def check(
+        self, data: Mc3000ChannelData, previous: _Sample | None, now: float
+    ) -> str | None:
+        if data.status in self.statuses:
+            return f"status {data.status.name}"
+        return None
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """Trigger when a numeric channel field leaves the range [minimum, maximum].
+
+    Temperatures are compared in the unit configured on the device.
+    """
+
+    field: str
+    minimum: float | None = None
+    maximum: float | None = None
+    action: WatchdogAction = WatchdogAction.STOP_CHARGE | WatchdogAction.ALERT
+    only_working: bool = True
+
+    def check(
+        self, data: Mc3000ChannelData, previous: _Sample | None, now: float
+    ) -> str | None:
+        if self.only_working and not data.is_working():
+            return None
+        value = getattr(data, self.field)
+        if self.minimum is not None and value < self.minimum:
+            return f"{self.field} {value} below {self.minimum}"
+        if self.maximum is not None and value > self.maximum:
+            return f"{self.field} {value} above {self.maximum}"
+        return None
+
+
+@dataclass(frozen=True)
+class RateRule:
+    """Trigger when a numeric channel field changes faster than allowed.
+
+    Rates are given in field units per second and computed between two consecutive
+    frames of the same channel.
+    """
+
+    field: str
+    min_rate: float | None = None
+    max_rate: float | None = None
+    action: WatchdogAction = WatchdogAction.ALERT | WatchdogAction.FAST_POLL
+    only_working: bool = True
+
+    def check(
+        self, data: Mc3000ChannelData, previous: _Sample | None, now: float
+    ) -> str | None:
+        if previous is None or now <= previous.timestamp:
+            return None
+        if self.only_working and not (data.is_working() and previous.data.is_working()):
+            return None
+        rate = (getattr(data, self.field) - getattr(previous.data, self.field)) / (
+            now - previous.timestamp
+        )
+        if self.min_rate is not None and rate < self.min_rate:
+            return f"{self.field} rate {rate:.4f}/s below {self.min_rate}/s"
+        if self.max_rate is not None and rate > self.max_rate:
+            return f"{self.field} rate {rate:.4f}/s above {self.max_rate}/s"
+        return None
+
+
+WatchdogRule = Union[StatusRule, ThresholdRule, RateRule]
+
+DEFAULT_RULES: tuple[WatchdogRule, ...] = (
+    StatusRule(
+        frozenset(
+            {
+                ChannelStatus.CONNECTION_BREAK,
+                ChannelStatus.TEMP_HIGH,
+                ChannelStatus.BATTERY_TEMP_HIGH,
+                ChannelStatus.BATTERY_SHORT_CIRCUIT,
+                ChannelStatus.REVERSE_POLARITY,
+            }
+        )
+    ),
+)
+
+
+@dataclass(frozen=True)
+class WatchdogEvent:
+    channel: int
+    rule: WatchdogRule
+    reason: str
+    data: Mc3000ChannelData
+    detected_at: float
+    latency: float | None = None
+    """Seconds from receiving the frame to completing all actions."""
+    stop_error: str | None = None
+    """Error raised by the STOP_CHARGE action, if it failed."""
+
+
+@dataclass(frozen=True)
+class _Sample:
+    timestamp: float
+    data: Mc3000ChannelData
+
+
+@dataclass
+class WatchdogStats:
+    events: int = 0
+    last_latency: float | None = None
+    max_latency: float | None = None
+    recent: deque[WatchdogEvent] = field(default_factory=lambda: deque(maxlen=100))
+
+
+WatchdogAlertCallback = Callable[[WatchdogEvent], None]
+
+
+class Mc3000Watchdog:
+    """Evaluate safety rules on every decoded channel frame of an MC3000.
+
+    Rules are evaluated synchronously in the notification handler, so actions are
+    taken right after the frame that violated a rule. A rule triggers once and is
+    re-armed as soon as it no longer matches.
+    """
+
+    def __init__(
+        self,
+        device: Mc3000,
+        rules: Sequence[WatchdogRule] = DEFAULT_RULES,
+        poller: Poller | None = None,
+        fast_poll_interval: float = 1.0,
+    ) -> None:
+        """Init the watchdog."""
+        self._device = device
+        self._rules = tuple(rules)
+        self._poller = poller
+        self._fast_poll_interval = fast_poll_interval
+        self._alert_callbacks: list[WatchdogAlertCallback] = []
+        self._samples: list[_Sample | None] = [None] * MC3000_CHANNEL_COUNT
+        self._active: set[tuple[int, int]] = set()
+        self._tasks: set[asyncio.Future[None]] = set()
+        self._normal_poll_interval: float | None = None
+        self._remove_listener: Callable[[], None] | None = None
+        self.stats = WatchdogStats()
+
+    @property
+    def rules(self) -> tuple[WatchdogRule, ...]:
+        """Get the configured rules."""
+        return self._rules
+
+    def add_alert_callback(self, callback: WatchdogAlertCallback) -> Callable[[], None]:
+        """Register a callback for triggered rules with the ALERT action.
+
+        The callback receives the event after all other actions completed, including
+        the measured detection-to-action latency.
+        Returns a function that removes the callback again.
+        """
+        self._alert_callbacks.append(callback)
+
+        def remove_callback() -> None:
+            self._alert_callbacks.remove(callback)
+
+        return remove_callback
+
+    def start(self) -> None:
+        """Start watching channel frames."""
+        if self._remove_listener is None:
+            self._remove_listener = self._device.add_channel_listener(self._on_channel)
+
+    async def stop(self) -> None:
+        """Stop watching and wait for pending actions."""
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _on_channel(self, channel: int, data: Mc3000ChannelData) -> None:
+        now = time.monotonic()
+        previous = self._samples[channel]
+        self._samples[channel] = _Sample(now, data)
+
+        for index, rule in enumerate(self._rules):
+            key = (channel, index)
+            reason = rule.check(data, previous, now)
+            if reason is None:
+                self._active.discard(key)
+                continue
+            if key in self._active:
+                continue
+            self._active.add(key)
+            event = WatchdogEvent(channel, rule, reason, data, now)
+            _LOGGER.warning(
+                "%s: Watchdog triggered on channel %d: %s",
+                self._device.name,
+                channel,
+                reason,
+            )
+            if rule.action & WatchdogAction.FAST_POLL:
+                self._start_fast_poll()
+            # The client lock is held until this notification has been handled
+            task = asyncio.ensure_future(self._handle_event(event))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        if self._normal_poll_interval is not None and not any(
+            self._rules[index].action & WatchdogAction.FAST_POLL
+            for _, index in self._active
+        ):
+            self._stop_fast_poll()
+
+    def _start_fast_poll(self) -> None:
+        if self._poller is None or self._normal_poll_interval is not None:
+            return
+        if self._poller.interval > self._fast_poll_interval:
+            self._normal_poll_interval = self._poller.interval
+            self._poller.interval = self._fast_poll_interval
+
+    def _stop_fast_poll(self) -> None:
+        assert self._poller is not None and self._normal_poll_interval is not None
+        # Keep an interval that was changed by someone else in the meantime
+        if self._poller.interval == self._fast_poll_interval:
+            self._poller.interval = self._normal_poll_interval
+        self._normal_poll_interval = None
+
+    async def _handle_event(self, event: WatchdogEvent) -> None:
+        if event.rule.action & WatchdogAction.STOP_CHARGE:
+            try:
+                await self._device.stop_charge(event.channel)
+            except Exception as error:  # pylint: disable=broad-except
+                # Alerts must go out even if the device is unreachable
+                _LOGGER.exception(
+                    "%s: Failed to stop charging channel %d",
+                    self._device.name,
+                    event.channel,
+                )
+                event = replace(event, stop_error=repr(error))
+
+        latency = time.monotonic() - event.detected_at
+        event = replace(event, latency=latency)
+        _LOGGER.debug(
+            "%s: Watchdog actions for channel %d took %.3f s",
+            self._device.name,
+            event.channel,
+            latency,
+        )
+        self.stats.events += 1
+        self.stats.last_latency = latency
+        if self.stats.max_latency is None or latency > self.stats.max_latency:
+            self.stats.max_latency = latency
+        self.stats.recent.append(event)
+
+        if event.rule.action & WatchdogAction.ALERT:
+            for callback in list(self._alert_callbacks):
+                try:
+                    callback(event)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("%s: Error in alert callback", self._device.name)
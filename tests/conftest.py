@@ -22,6 +22,7 @@ class MockMc3000BleakClient:
     def __init__(self, *args, **kwargs):
         """Mock BleakClient."""
         self.packets_sent: int = 0
+        self.disconnected_callback = kwargs.get("disconnected_callback")
 
     async def connect(self, *args, **kwargs):
         """Mock BleakClient.connect."""
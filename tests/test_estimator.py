@@ -0,0 +1,92 @@
+import math
+
+import pytest
+from bleak import BLEDevice
+
+from skyrc_ble import ChannelEstimator, Mc3000, Mc3000Estimator, Poller
+from skyrc_ble.models import BatteryType, ChannelStatus, Mc3000ChannelData
+
+
+def _frame(time, voltage, current, capacity, **kwargs):
+    return Mc3000ChannelData(
+        status=kwargs.pop("status", ChannelStatus.CHARGE),
+        time=time,
+        voltage=voltage,
+        current=current,
+        capacity=capacity,
+        **kwargs,
+    )
+
+
+def test_estimator_constant_current():
+    estimator = ChannelEstimator(termination_current=0.1)
+    assert estimator.update(_frame(0, 3.7, 1.0, 0)).remaining_time is None
+
+    for second in range(1, 31):
+        estimate = estimator.update(_frame(second, 3.7 + second * 0.001, 1.0, second))
+
+    # 470 s until 4.2 V plus the assumed constant voltage phase
+    assert estimate.remaining_time == pytest.approx(470 + 1200 * math.log(10))
+    assert estimate.final_capacity == pytest.approx(30 + 470 / 3.6 + 0.9 * 1200 / 3.6)
+    assert 0 < estimate.time_confidence < 0.5
+    assert not estimate.constant_voltage
+
+
+def test_estimator_constant_voltage():
+    estimator = ChannelEstimator(termination_current=0.1)
+    for second in range(0, 60):
+        current = 1.0 * math.exp(-second / 600)
+        estimate = estimator.update(_frame(second, 4.2, current, 1000 + second))
+
+    assert estimate.constant_voltage
+    assert estimate.remaining_time == pytest.approx(600 * math.log(current / 0.1))
+    assert estimate.time_confidence > 0.9
+
+    done = estimator.update(_frame(61, 4.2, 0.0, 1234, status=ChannelStatus.DONE))
+    assert done.remaining_time == 0.0
+    assert done.final_capacity == 1234
+
+    # A restarted program resets the estimate
+    assert estimator.update(_frame(0, 3.7, 1.0, 0)).remaining_time is None
+
+
+def test_estimator_nominal_capacity():
+    estimator = ChannelEstimator(nominal_capacity=2000)
+    frame = _frame(100, 1.3, 1.0, 500, type=BatteryType.NIMH)
+    estimate = estimator.update(frame)
+    assert estimate.remaining_time == pytest.approx(1500 * 3.6)
+    assert estimate.final_capacity == 2000
+    assert ChannelEstimator().update(frame).remaining_time is None
+
+
+@pytest.mark.asyncio
+async def test_mc3000_estimator_wake_hint(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    poller = Poller(mc3000, interval=60)
+    estimator = Mc3000Estimator(mc3000, nominal_capacity=20)
+    estimator.start(poller, lead_time=1.0)
+    await mc3000.update()
+
+    # Channel 1 charges with 1.001 A and has 7 mAh left
+    assert estimator.estimate(1).remaining_time == pytest.approx(7 * 3.6 / 1.001)
+    assert estimator.estimate(2).remaining_time == 0.0
+    assert estimator.next_wakeup(1.0) == pytest.approx(7 * 3.6 / 1.001 - 1, abs=0.1)
+    deadline = poller._next_deadline(0.0, 0.0)
+    assert deadline == pytest.approx(7 * 3.6 / 1.001 - 1, abs=0.1)
+
+    estimator.stop()
+    assert poller._next_deadline(0.0, 0.0) == 60
+
+
+def test_estimator_quantized_current():
+    estimator = ChannelEstimator(termination_current=0.1)
+    for second in range(0, 1800, 10):
+        current = round(1.0 * math.exp(-second / 2400), 3)
+        estimate = estimator.update(_frame(second, 4.2, current, 1000 + second))
+
+    remaining = 2400 * math.log(current / 0.1)
+    assert estimate.remaining_time == pytest.approx(remaining, rel=0.05)
+    assert estimate.time_confidence > 0.9
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from bleak import BLEDevice
+
+from skyrc_ble import Mc3000, Poller
+
+
+@pytest.mark.asyncio
+async def test_poller_updates(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    poller = Poller(mc3000, interval=60)
+    poller.start()
+    await asyncio.sleep(0.01)
+    assert poller.is_running
+    assert mc3000.state.basic_data is not None
+
+    sent = mc3000._client.packets_sent
+    poller.poll_now()
+    await asyncio.sleep(0.01)
+    assert mc3000._client.packets_sent == sent + 5
+
+    sent = mc3000._client.packets_sent
+    poller.interval = 0.001
+    await asyncio.sleep(0.05)
+    assert mc3000._client.packets_sent > sent + 5
+
+    await poller.stop()
+    assert not poller.is_running
+
+    with pytest.raises(ValueError):
+        poller.interval = 0
+
+
+@pytest.mark.asyncio
+async def test_poller_survives_unexpected_errors(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    calls = []
+
+    async def update():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    mc3000.update = update
+    poller = Poller(mc3000, interval=0.001, min_interval=0.001)
+    poller.start()
+    await asyncio.sleep(0.05)
+    assert poller.is_running
+    assert len(calls) > 1
+    await poller.stop()
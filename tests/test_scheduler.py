@@ -0,0 +1,164 @@
+import pytest
+from bleak import BLEDevice
+from bleak.exc import BleakError
+
+from skyrc_ble import ChargeJob, ChargeScheduler, Mc3000
+from skyrc_ble.models import BatteryType, ChannelStatus
+
+
+def _channel_packet(channel, status, time, voltage):
+    packet = bytearray.fromhex("0f55000000000000000000000000001800190000")
+    packet[2] = channel
+    packet[6] = status
+    packet[7:9] = time.to_bytes(2, "big")
+    packet[9:11] = round(voltage * 1000).to_bytes(2, "big")
+    packet[11:13] = (1000 if status == ChannelStatus.CHARGE else 0).to_bytes(2, "big")
+    packet[-1] = sum(packet[:-1]) & 255
+    return packet
+
+
+async def _accept(job, device, channel):
+    return True
+
+
+@pytest.mark.asyncio
+async def test_scheduler_places_jobs(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+    await mc3000.update()
+
+    scheduler = ChargeScheduler([mc3000], load_callback=_accept)
+    scheduler.submit(ChargeJob("low", priority=0))
+    scheduler.submit(ChargeJob("nimh", priority=5, battery_type=BatteryType.NIMH))
+    scheduler.submit(ChargeJob("long", priority=1, expected_duration=7200))
+    scheduler.submit(ChargeJob("short", priority=1, expected_duration=3600))
+    scheduler.submit(ChargeJob("extra", priority=0))
+    assert [job.cell_id for job in scheduler.pending] == [
+        "nimh",
+        "short",
+        "long",
+        "low",
+        "extra",
+    ]
+
+    sent = mc3000._client.packets_sent
+    started = await scheduler.schedule()
+    assert [(a.job.cell_id, a.channel) for a in started] == [
+        ("short", 0),
+        ("long", 2),
+        ("low", 3),
+    ]
+    assert mc3000._client.packets_sent == sent + 1
+    assert [job.cell_id for job in scheduler.pending] == ["nimh", "extra"]
+
+    # The DONE status of channel 2 belongs to the previous cell
+    await mc3000.update()
+    assert await scheduler.schedule() == []
+    assert scheduler.finished == []
+
+    # Channel 0 starts working and is stopped, channel 2 is done after a restart
+    await mc3000._parse_packet(_channel_packet(0, ChannelStatus.CHARGE, 10, 3.7))
+    await scheduler.schedule()
+    await mc3000._parse_packet(_channel_packet(0, ChannelStatus.STANDBY, 12, 3.7))
+    await mc3000._parse_packet(_channel_packet(2, ChannelStatus.DONE, 60, 4.2))
+    await scheduler.schedule()
+    assert [(a.job.cell_id, a.status) for a in scheduler.finished] == [
+        ("short", ChannelStatus.STANDBY),
+        ("long", ChannelStatus.DONE),
+    ]
+
+    stats = scheduler.stats()
+    assert stats.slots == 4
+    assert stats.finished == 1
+    assert stats.failed == 1
+    assert 0 < stats.utilization <= 1
+    assert stats.cells_per_hour > 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_requires_loaded_cells(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+    await mc3000.update()
+
+    scheduler = ChargeScheduler([mc3000], start_timeout=2)
+    scheduler.submit(ChargeJob("cell0"))
+    scheduler.submit(ChargeJob("cell1"))
+
+    # Only channel 0 holds an idle cell, channel 2 is DONE and channel 3 is empty
+    started = await scheduler.schedule()
+    assert [(a.job.cell_id, a.channel) for a in started] == [("cell0", 0)]
+
+    # The channel never starts working
+    for _ in range(2):
+        await mc3000.update()
+        await scheduler.schedule()
+        assert len(scheduler.running) == 1
+    # Scheduling without new frames does not count towards the timeout
+    for _ in range(5):
+        await scheduler.schedule()
+    assert len(scheduler.running) == 1
+    await mc3000.update()
+    await scheduler.schedule()
+    assert scheduler.running == []
+    assert scheduler.finished[0].status == ChannelStatus.STANDBY
+    assert not scheduler.finished[0].has_worked
+
+    # The failed cell is still in the slot
+    await mc3000.update()
+    await scheduler.schedule()
+    assert scheduler.running == []
+
+    # The cell is swapped
+    await mc3000._parse_packet(_channel_packet(0, ChannelStatus.STANDBY, 0, 0))
+    await scheduler.schedule()
+    assert scheduler.running == []
+    await mc3000._parse_packet(_channel_packet(0, ChannelStatus.STANDBY, 0, 3.6))
+    await scheduler.schedule()
+    assert [(a.job.cell_id, a.channel) for a in scheduler.running] == [("cell1", 0)]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_start_failure(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+    await mc3000.update()
+
+    async def start_charge_multi(channels):
+        raise BleakError("Not connected")
+
+    mc3000.start_charge_multi = start_charge_multi
+    scheduler = ChargeScheduler([mc3000], load_callback=_accept)
+    scheduler.submit(ChargeJob("cell0", priority=1))
+    scheduler.submit(ChargeJob("cell1"))
+
+    assert await scheduler.schedule() == []
+    assert scheduler.running == []
+    assert [job.cell_id for job in scheduler.pending] == ["cell0", "cell1"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_power_budget(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+    await mc3000.update()
+
+    async def load(job, device, channel):
+        return channel != 0
+
+    scheduler = ChargeScheduler(
+        [mc3000], power_limits={mc3000.address: 5.0}, load_callback=load
+    )
+    # Channel 1 already draws about 3.7 W
+    assert scheduler.power_limit(mc3000) == 5.0
+    for index in range(3):
+        scheduler.submit(ChargeJob(f"cell{index}", charge_current=0.2))
+
+    started = await scheduler.schedule()
+    assert [(a.job.cell_id, a.channel) for a in started] == [("cell0", 2)]
+    assert [job.cell_id for job in scheduler.pending] == ["cell1", "cell2"]
+    assert ChargeScheduler([mc3000]).power_limit(mc3000) == 55.0
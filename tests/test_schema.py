@@ -0,0 +1,51 @@
+import pytest
+
+from skyrc_ble.mc3000 import SCHEMA_GET_BASIC_DATA, SCHEMA_GET_CHANNEL_DATA
+from skyrc_ble.models import (
+    BatteryType,
+    ChannelStatus,
+    CoolingFanMode,
+    DisplayMode,
+    TemperatureUnit,
+)
+from skyrc_ble.schema import Field, PacketSchema, Skip
+
+
+def test_schema_decode():
+    packet = bytearray.fromhex("0f55010000000100360e6e03e9000d1800190749")
+    values = SCHEMA_GET_CHANNEL_DATA.decode(packet)
+    assert values["channel"] == 1
+    assert values["type"] is BatteryType.LIION
+    assert values["status"] is ChannelStatus.CHARGE
+    assert values["voltage"] == 3.694
+    assert values["current"] == 1.001
+    assert values["capacity"] == 13
+
+
+def test_schema_encode_roundtrip():
+    values = {
+        "temp_unit": TemperatureUnit.FAHRENHEIT,
+        "system_beep": True,
+        "display": DisplayMode.ALWAYS_ON,
+        "screensaver": False,
+        "cooling_fan": CoolingFanMode.TEMP_30C,
+        "input_voltage": 12.345,
+    }
+    payload = SCHEMA_GET_BASIC_DATA.encode(**values)
+    assert SCHEMA_GET_BASIC_DATA.decode(b"\x0f\x61" + payload) == values
+
+
+def test_schema_skip_and_defaults():
+    schema = PacketSchema(0x10, [Skip(2), Field("value", "H", scale=10)])
+    assert schema.names == ("value",)
+    assert schema.encode() == b"\x00\x00\x00\x00"
+    assert schema.encode(value=1.5) == b"\x00\x00\x00\x0f"
+    assert schema.decode(b"\x0f\x10\xff\xff\x00\x0f") == {"value": 1.5}
+    assert PacketSchema(0x11).decode(b"\x0f\x11") == {}
+
+
+@pytest.mark.parametrize("name", ["class", "x) or (1", "2nd", "a-b"])
+def test_schema_rejects_invalid_field_names(name):
+    with pytest.raises(ValueError):
+        Field(name, "B")
+    assert Skip(2).name == ""
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from bleak import BLEDevice
+from bleak.exc import BleakError
+
+from skyrc_ble import Mc3000Snapshot, Mc3000ThreadedClient
+from skyrc_ble.models import ChannelStatus
+
+
+def test_threaded_client(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    client = Mc3000ThreadedClient(ble_device, poll_interval=60)
+    assert client.snapshot == Mc3000Snapshot()
+    with pytest.raises(RuntimeError):
+        client.update()
+
+    client.start()
+    assert client.is_running
+    client.update().result(timeout=5)
+
+    snapshot = client.snapshot
+    assert snapshot.is_connected
+    assert snapshot.sw_version == "1.15"
+    assert snapshot.basic_data.input_voltage == 11.0
+    assert snapshot.channels[1].status == ChannelStatus.CHARGE
+    assert isinstance(snapshot.channels, tuple)
+
+    assert client.start_charge(0).result(timeout=5) is None
+    assert client.stop_charge(0).result(timeout=5) is None
+    with pytest.raises(ValueError):
+        client.start_charge(7).result(timeout=5)
+    assert client.submit(lambda device: device.start_charge_multi(3)) is not None
+    client.set_poll_interval(30)
+
+    client.stop(timeout=5)
+    assert not client.is_running
+    assert client.snapshot is not snapshot
+    with pytest.raises(RuntimeError):
+        client.update()
+
+
+def test_threaded_client_startup_error(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    client = Mc3000ThreadedClient(ble_device, poll_interval=-1)
+    with pytest.raises(ValueError):
+        client.start()
+    assert not client.is_running
+
+
+def test_threaded_client_stop_with_failing_disconnect(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    client = Mc3000ThreadedClient(ble_device, poll_interval=60)
+    client.start()
+
+    async def disconnect():
+        raise BleakError("Disconnect failed")
+
+    async def slow(device):
+        await asyncio.sleep(0.05)
+
+    client._device.disconnect = disconnect
+    first = client.submit(slow)
+    client._put(None)
+    late = client.submit(slow)
+    client._thread.join(5)
+
+    assert not client.is_running
+    assert first.result(timeout=1) is None
+    with pytest.raises(RuntimeError):
+        late.result(timeout=1)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_threaded_client_publishes_polls_and_disconnects(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    client = Mc3000ThreadedClient(ble_device, poll_interval=60)
+    client.start()
+    _wait_for(lambda: client.snapshot.basic_data is not None)
+    assert client.snapshot.is_connected
+
+    # A failed poll still publishes a snapshot
+    async def update():
+        raise BleakError("Update failed")
+
+    snapshot = client.snapshot
+    client._device.update = update
+    client._loop.call_soon_threadsafe(client._poller.poll_now)
+    _wait_for(lambda: client.snapshot is not snapshot)
+
+    bleak_client = client._device._client
+    client._loop.call_soon_threadsafe(bleak_client.disconnected_callback, bleak_client)
+    _wait_for(lambda: not client.snapshot.is_connected)
+    client.stop(timeout=5)
+
+
+def test_threaded_client_submit_during_stop(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    client = Mc3000ThreadedClient(ble_device, poll_interval=60)
+    client.start()
+
+    async def noop(device):
+        pass
+
+    futures = []
+    rejected = threading.Event()
+
+    def submit():
+        while True:
+            try:
+                futures.append(client.submit(noop))
+            except RuntimeError:
+                rejected.set()
+                return
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    client.stop(timeout=5)
+    thread.join(5)
+
+    assert rejected.is_set()
+    # Every accepted command is either executed or failed
+    for future in futures:
+        error = future.exception(timeout=1)
+        assert error is None or isinstance(error, RuntimeError)
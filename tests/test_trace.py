@@ -0,0 +1,127 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from bleak import BLEDevice
+
+from skyrc_ble import Mc3000, trace
+from skyrc_ble.mc3000 import CMD_GET_BASIC_DATA, CMD_STOP_CHARGE
+
+
+@pytest.mark.asyncio
+async def test_trace_disabled(mock_mc3000_bleak):
+    assert trace.get_tracer() is None
+    with trace.span("noop") as span:
+        assert span is None
+
+
+@pytest.mark.asyncio
+async def test_trace_export(mock_mc3000_bleak, tmp_path):
+    tracer = trace.enable()
+    try:
+        ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+        mc3000 = Mc3000(ble_device)
+        await mc3000.connect()
+        await mc3000.update()
+    finally:
+        assert trace.disable() is tracer
+
+    names = [event["name"] for event in tracer.events]
+    for name in (
+        "connect",
+        "establish_connection",
+        "start_notify",
+        "mc3000.connect",
+        "update",
+        "lock_wait",
+        "write",
+        "reply_wait",
+        "parse_packet",
+    ):
+        assert name in names
+    assert names.count("send_packet") == 6
+    update = next(event for event in tracer.events if event["name"] == "update")
+    assert update["dur"] > 0
+
+    path = tmp_path / "trace.json"
+    tracer.export_chrome_trace(path)
+    data = json.loads(path.read_text())
+    assert data["traceEvents"][:2] == [
+        {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Charger"}},
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": 1,
+            "tid": 1,
+            "args": {"name": "Charger #1"},
+        },
+    ]
+    count = len(tracer.events)
+    assert data["traceEvents"][-count:] == tracer.events
+
+
+def _assert_nested(events):
+    tracks = {}
+    for event in events:
+        tracks.setdefault((event["pid"], event["tid"]), []).append(event)
+    for spans in tracks.values():
+        for a in spans:
+            for b in spans:
+                a_end = a["ts"] + a["dur"]
+                b_end = b["ts"] + b["dur"]
+                # Spans on one thread are either disjoint or contain each other
+                assert (
+                    a_end <= b["ts"]
+                    or b_end <= a["ts"]
+                    or (a["ts"] <= b["ts"] and b_end <= a_end)
+                    or (b["ts"] <= a["ts"] and a_end <= b_end)
+                )
+    return tracks
+
+
+@pytest.mark.asyncio
+async def test_trace_concurrent_tasks(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    tracer = trace.enable()
+    try:
+        await asyncio.gather(
+            mc3000._send_packet(CMD_GET_BASIC_DATA),
+            mc3000._send_packet(CMD_STOP_CHARGE, [1]),
+        )
+    finally:
+        trace.disable()
+
+    send_packets = [e for e in tracer.events if e["name"] == "send_packet"]
+    assert len(send_packets) == 2
+    # The second packet waits for the lock while the first one is being sent
+    assert send_packets[0]["tid"] != send_packets[1]["tid"]
+    assert send_packets[0]["pid"] == send_packets[1]["pid"]
+    _assert_nested(tracer.events)
+
+
+def test_trace_threads():
+    tracer = trace.Tracer()
+    barrier = threading.Barrier(4)
+
+    def work():
+        barrier.wait()
+        for _ in range(50):
+            with tracer.span("outer", "shared"):
+                with tracer.span("inner", "shared"):
+                    time.sleep(0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(tracer.events) == 4 * 50 * 2
+    assert not tracer._open
+    tracks = _assert_nested(tracer.events)
+    assert len(tracks) <= 4
@@ -0,0 +1,132 @@
+import pytest
+from bleak import BLEDevice
+
+from skyrc_ble import (
+    Mc3000,
+    Mc3000Watchdog,
+    Poller,
+    RateRule,
+    StatusRule,
+    ThresholdRule,
+    WatchdogAction,
+)
+from skyrc_ble.models import ChannelStatus
+
+
+@pytest.mark.asyncio
+async def test_watchdog_threshold_stops_charge(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    watchdog = Mc3000Watchdog(mc3000, [ThresholdRule("voltage", maximum=3.65)])
+    alerts = []
+    watchdog.add_alert_callback(alerts.append)
+    watchdog.start()
+
+    sent = mc3000._client.packets_sent
+    await mc3000.update()
+    await watchdog.stop()
+
+    # Only channel 1 is working and above the threshold
+    assert [event.channel for event in alerts] == [1]
+    assert alerts[0].latency is not None and alerts[0].latency >= 0
+    assert watchdog.stats.events == 1
+    assert watchdog.stats.max_latency == alerts[0].latency
+    assert mc3000._client.packets_sent == sent + 5 + 1
+
+
+@pytest.mark.asyncio
+async def test_watchdog_triggers_once_until_cleared(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    watchdog = Mc3000Watchdog(
+        mc3000,
+        [StatusRule(frozenset({ChannelStatus.DONE}), action=WatchdogAction.ALERT)],
+    )
+    alerts = []
+    watchdog.add_alert_callback(alerts.append)
+    watchdog.start()
+
+    await mc3000.update()
+    await mc3000.update()
+    await watchdog.stop()
+
+    assert [event.channel for event in alerts] == [2]
+    assert alerts[0].reason == "status DONE"
+
+
+@pytest.mark.asyncio
+async def test_watchdog_rate_rule(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    rule = RateRule("voltage", max_rate=0.01)
+    assert rule.check(mc3000.state.channels[1], None, 0.0) is None
+
+    watchdog = Mc3000Watchdog(mc3000, [rule])
+    alerts = []
+    watchdog.add_alert_callback(alerts.append)
+    watchdog.start()
+
+    await mc3000.update()
+    packet = bytearray.fromhex("0f55010000000100370f0003e9000d1800190700")
+    packet[-1] = sum(packet[:-1]) & 255
+    await mc3000._parse_packet(packet)
+    await watchdog.stop()
+
+    assert [event.channel for event in alerts] == [1]
+    assert "voltage rate" in alerts[0].reason
+
+
+@pytest.mark.asyncio
+async def test_watchdog_fast_poll_is_restored(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    poller = Poller(mc3000, interval=60)
+    watchdog = Mc3000Watchdog(
+        mc3000,
+        [ThresholdRule("voltage", maximum=3.65, action=WatchdogAction.FAST_POLL)],
+        poller=poller,
+        fast_poll_interval=2,
+    )
+    watchdog.start()
+
+    await mc3000.update()
+    assert poller.interval == 2
+
+    # Channel 1 drops below the threshold again
+    packet = bytearray.fromhex("0f55010000000100370e100000000d1800190700")
+    packet[-1] = sum(packet[:-1]) & 255
+    await mc3000._parse_packet(packet)
+    await watchdog.stop()
+    assert poller.interval == 60
+
+
+@pytest.mark.asyncio
+async def test_watchdog_alerts_when_stop_fails(mock_mc3000_bleak):
+    ble_device = BLEDevice("00:01:02:03:04:05", "Charger", None, 0)
+    mc3000 = Mc3000(ble_device)
+    await mc3000.connect()
+
+    async def stop_charge(channel):
+        raise AttributeError("'NoneType' object has no attribute 'write_gatt_char'")
+
+    mc3000.stop_charge = stop_charge
+    watchdog = Mc3000Watchdog(mc3000, [ThresholdRule("voltage", maximum=3.65)])
+    alerts = []
+    watchdog.add_alert_callback(alerts.append)
+    watchdog.start()
+
+    await mc3000.update()
+    await watchdog.stop()
+
+    assert [event.channel for event in alerts] == [1]
+    assert "AttributeError" in alerts[0].stop_error
+    assert alerts[0].latency is not None
+    assert watchdog.stats.events == 1